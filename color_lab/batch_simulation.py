@@ -0,0 +1,214 @@
+import asyncio
+import argparse
+import csv
+import functools
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, TextIO
+
+import numpy as np
+
+from common.mixbox_surrogate import MixboxSurrogate
+from common.recipe_bounds import INTEGER_RECIPE_KEYS, RECIPE_BOUNDS
+from device_drivers import ColorMixerDriver, FluidSimulationApi, FluidSimulationManager
+
+RECIPE_KEYS = tuple(RECIPE_BOUNDS)
+OUTPUT_KEYS = ("index", *RECIPE_KEYS, "red", "green", "blue", "variance_red", "variance_green", "variance_blue")
+
+
+def generate_sobol_recipes(num_recipes: int, seed: int | None = None) -> list[dict[str, float]]:
+    """
+    Generate a scrambled Sobol set of recipes within the optimizer bounds. Sobol sets are balanced at powers of 2, so
+    the recipes are the first points of the smallest such set that holds them.
+    """
+    from scipy.stats import qmc
+
+    lower, upper = zip(*RECIPE_BOUNDS.values())
+    points = qmc.Sobol(d=len(RECIPE_KEYS), seed=seed).random_base2(math.ceil(math.log2(max(num_recipes, 1))))
+    samples = qmc.scale(points[:num_recipes], lower, upper)
+    return [_normalize_recipe(dict(zip(RECIPE_KEYS, sample))) for sample in samples]
+
+
+def read_recipes(path: str) -> list[dict[str, float]]:
+    """
+    Read recipes from a CSV file with a column per recipe key, optionally prefixed with "mix_colors.". Other columns,
+    such as the measurements in the output of this script, are ignored.
+    """
+    with open(path, newline="") as f:
+        return [
+            _normalize_recipe(
+                {
+                    key.removeprefix("mix_colors."): float(value)
+                    for key, value in row.items()
+                    if key.removeprefix("mix_colors.") in RECIPE_BOUNDS
+                }
+            )
+            for row in csv.DictReader(f)
+        ]
+
+
+def _normalize_recipe(recipe: dict[str, float]) -> dict[str, float]:
+    missing_keys = [key for key in RECIPE_KEYS if key not in recipe]
+    if missing_keys:
+        raise ValueError(f"Recipe is missing the keys: {', '.join(missing_keys)}")
+    return {key: int(round(recipe[key])) if key in INTEGER_RECIPE_KEYS else float(recipe[key]) for key in RECIPE_KEYS}
+
+
+class ResultWriter:
+    """Streams evaluated recipes to a CSV file as they finish."""
+
+    def __init__(self, file: TextIO):
+        """Initialize the writer and write the header."""
+        self.file = file
+        self.writer = csv.DictWriter(file, fieldnames=OUTPUT_KEYS)
+        self.writer.writeheader()
+        self.num_written = 0
+
+    def write(self, index: int, recipe: dict[str, float], rgb: Any, variance: Any) -> None:
+        """Write the result of a recipe. Missing measurements are left empty."""
+        row = {"index": index, **recipe}
+        if rgb is not None:
+            row.update(zip(("red", "green", "blue"), rgb))
+        if variance is not None:
+            row.update(zip(("variance_red", "variance_green", "variance_blue"), variance))
+        self.writer.writerow(row)
+        self.file.flush()
+        self.num_written += 1
+
+
+async def wait_for_simulations(fluid_sim_manager: FluidSimulationManager) -> None:
+    """Wait until a browser is attached to every fluid simulation instance."""
+    while any(server.client is None for server in fluid_sim_manager.fluid_servers):
+        await asyncio.sleep(0.5)
+
+
+async def evaluate_with_simulations(
+    recipes: list[dict[str, float]],
+    writer: ResultWriter,
+    fluid_sim_manager: FluidSimulationManager,
+    connect_timeout_sec: float = 120.0,
+) -> None:
+    """Evaluate recipes in parallel across fluid simulation instances, one recipe per instance at a time."""
+    try:
+        await fluid_sim_manager.initialize_instances()
+
+        print("Waiting for all fluid simulations to connect...")
+        try:
+            await asyncio.wait_for(wait_for_simulations(fluid_sim_manager), timeout=connect_timeout_sec)
+        except asyncio.TimeoutError:
+            raise TimeoutError(
+                f"Fluid simulations did not connect within {connect_timeout_sec} seconds. Open the simulation pages "
+                "in a browser or run without --no-browser."
+            ) from None
+
+        await _run_simulation_workers(recipes, writer, fluid_sim_manager)
+    finally:
+        await fluid_sim_manager.cleanup()
+
+
+async def _run_simulation_workers(
+    recipes: list[dict[str, float]], writer: ResultWriter, fluid_sim_manager: FluidSimulationManager
+) -> None:
+    queue: asyncio.Queue[tuple[int, dict[str, float]]] = asyncio.Queue()
+    for index, recipe in enumerate(recipes):
+        queue.put_nowait((index, recipe))
+
+    async def worker(api: FluidSimulationApi) -> None:
+        mixer = ColorMixerDriver(api)
+        while not queue.empty():
+            index, recipe = queue.get_nowait()
+            color, variance = None, None
+            try:
+                await mixer.mix(**recipe)
+                color = await api.compute_average_color()
+                variance = await api.compute_color_variance()
+            except Exception as e:
+                print(f"Error evaluating recipe {index}: {e}")
+            writer.write(
+                index,
+                recipe,
+                (color["r"], color["g"], color["b"]) if color else None,
+                (variance["r"], variance["g"], variance["b"]) if variance else None,
+            )
+            print(f"Evaluated recipe {index} ({writer.num_written}/{len(recipes)})")
+
+    await asyncio.gather(*(worker(api) for api in fluid_sim_manager.fluid_apis))
+
+
+@functools.cache
+def _get_surrogate() -> MixboxSurrogate:
+    return MixboxSurrogate()
+
+
+def _predict_rgb(recipes: np.ndarray) -> np.ndarray:
+    return _get_surrogate().predict_rgb(recipes)
+
+
+async def evaluate_with_surrogate(
+    recipes: list[dict[str, float]], writer: ResultWriter, num_workers: int, chunk_size: int = 10000
+) -> None:
+    """Evaluate recipes with the Mixbox surrogate in chunks across worker processes."""
+    surrogate_keys = [key for key in RECIPE_KEYS if key not in INTEGER_RECIPE_KEYS]
+    recipe_array = np.array([[recipe[key] for key in surrogate_keys] for recipe in recipes])
+
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+
+        async def evaluate_chunk(start: int) -> tuple[int, np.ndarray]:
+            chunk = recipe_array[start : start + chunk_size]
+            return start, await loop.run_in_executor(executor, _predict_rgb, chunk)
+
+        for future in asyncio.as_completed([evaluate_chunk(start) for start in range(0, len(recipes), chunk_size)]):
+            start, rgb_chunk = await future
+            for offset, rgb in enumerate(np.rint(rgb_chunk).astype(int).tolist()):
+                writer.write(start + offset, recipes[start + offset], rgb, None)
+            print(f"Evaluated {writer.num_written}/{len(recipes)} recipes")
+
+
+async def main() -> None:
+    """Main entry point for the application."""
+    parser = argparse.ArgumentParser(description="Offline batch evaluation of color mixing recipes")
+    recipe_source = parser.add_mutually_exclusive_group(required=True)
+    recipe_source.add_argument("--recipes", type=str, help="CSV file with one recipe per row.")
+    recipe_source.add_argument("--sobol", type=int, help="Number of Sobol recipes to generate within the bounds.")
+    parser.add_argument("--seed", type=int, help="Seed for generating Sobol recipes.")
+    parser.add_argument("--output", type=str, required=True, help="CSV file to stream the results to.")
+    parser.add_argument(
+        "--backend",
+        choices=["simulation", "surrogate"],
+        default="simulation",
+        help="Evaluate with fluid simulation instances or with the Mixbox surrogate in worker processes.",
+    )
+    parser.add_argument("--workers", type=int, default=3, help="Number of simulation instances or worker processes.")
+    parser.add_argument("--base-websocket-port", type=int, default=8130, help="First fluid simulation WebSocket port.")
+    parser.add_argument("--web-port", type=int, default=9150, help="Port of the fluid simulation web server.")
+    parser.add_argument("--no-browser", action="store_true", help="Do not open the fluid simulations in a browser.")
+    parser.add_argument(
+        "--connect-timeout", type=float, default=120.0, help="Seconds to wait for the fluid simulations to connect."
+    )
+    args = parser.parse_args()
+
+    recipes = read_recipes(args.recipes) if args.recipes else generate_sobol_recipes(args.sobol, args.seed)
+    print(f"Evaluating {len(recipes)} recipes with the {args.backend} backend")
+
+    with open(args.output, "w", newline="") as f:
+        writer = ResultWriter(f)
+        if args.backend == "simulation":
+            fluid_sim_manager = FluidSimulationManager(
+                args.workers,
+                enable_sleeping=False,
+                base_websocket_port=args.base_websocket_port,
+                web_port=args.web_port,
+                open_browsers=not args.no_browser,
+            )
+            try:
+                await evaluate_with_simulations(recipes, writer, fluid_sim_manager, args.connect_timeout)
+            except TimeoutError as e:
+                sys.exit(str(e))
+        else:
+            await evaluate_with_surrogate(recipes, writer, args.workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+import copy
+from dataclasses import dataclass, field, fields
+from typing import Any
+
+COLORS = ("cyan", "magenta", "yellow", "black")
+
+
+@dataclass(slots=True)
+class BeakerState:
+    """
+    Typed state of a beaker that is stored in its resource meta under the same keys as the fields. Fields that are
+    assigned a new value are tracked as dirty, so that only changed fields are written back to the meta. Fields at their
+    default value are left out of the meta, except for the location, volume and cleanliness.
+    """
+
+    location: str | None = None
+    volume: float = 0
+    clean: bool = True
+    cyan_volume: float = 0
+    cyan_strength: float = 0
+    magenta_volume: float = 0
+    magenta_strength: float = 0
+    yellow_volume: float = 0
+    yellow_strength: float = 0
+    black_volume: float = 0
+    black_strength: float = 0
+    mixing_time: int = 0
+    mixing_speed: int = 0
+    # Recipe of each mix into the current contents, in the order of the add_mix arguments
+    mix_history: list[list[float]] = field(default_factory=list)
+    _dirty: set[str] = field(default_factory=set, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # _dirty is assigned last during initialization, so initial values are not tracked
+        dirty = getattr(self, "_dirty", None)
+        if dirty is not None and name != "_dirty" and getattr(self, name) != value:
+            dirty.add(name)
+        object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_meta(cls, meta: dict[str, Any]) -> "BeakerState":
+        """Read the state from a resource meta, using defaults for missing keys."""
+        # Copied so that in-place changes to the state are not applied to the meta without being tracked as dirty
+        return cls(**{key: copy.deepcopy(meta[key]) for key in _STATE_KEYS if key in meta})
+
+    def apply_to(self, meta: dict[str, Any]) -> None:
+        """Write the fields that changed since the state was read or last applied to a resource meta."""
+        for key in self._dirty:
+            value = getattr(self, key)
+            if _is_stored(key, value):
+                meta[key] = value
+            else:
+                meta.pop(key, None)
+        self._dirty.clear()
+
+    def add_mix(
+        self,
+        cyan_volume: float,
+        cyan_strength: float,
+        magenta_volume: float,
+        magenta_strength: float,
+        yellow_volume: float,
+        yellow_strength: float,
+        black_volume: float,
+        black_strength: float,
+        mixing_time: int,
+        mixing_speed: int,
+    ) -> None:
+        """Record dispensing and mixing colors into the beaker."""
+        self.cyan_volume += cyan_volume
+        self.cyan_strength = cyan_strength
+        self.magenta_volume += magenta_volume
+        self.magenta_strength = magenta_strength
+        self.yellow_volume += yellow_volume
+        self.yellow_strength = yellow_strength
+        self.black_volume += black_volume
+        self.black_strength = black_strength
+        self.volume += cyan_volume + magenta_volume + yellow_volume + black_volume
+        self.clean = False
+        self.mixing_time = mixing_time
+        self.mixing_speed = mixing_speed
+        self.mix_history = [
+            *self.mix_history,
+            [
+                cyan_volume,
+                cyan_strength,
+                magenta_volume,
+                magenta_strength,
+                yellow_volume,
+                yellow_strength,
+                black_volume,
+                black_strength,
+                mixing_time,
+                mixing_speed,
+            ],
+        ]
+
+    def empty(self) -> None:
+        """Record emptying the beaker, which discards the mix history of its contents."""
+        self.volume = 0
+        for color in COLORS:
+            setattr(self, f"{color}_volume", 0)
+        self.mix_history = []
+
+    def reset(self, location: str) -> None:
+        """Reset the beaker to an empty and clean state at a location."""
+        for key in _STATE_KEYS:
+            setattr(self, key, copy.copy(_DEFAULTS[key]))
+        self.location = location
+
+
+_STATE_KEYS = tuple(f.name for f in fields(BeakerState) if f.init)
+_DEFAULT_STATE = BeakerState()
+_DEFAULTS = {key: getattr(_DEFAULT_STATE, key) for key in _STATE_KEYS}
+_ALWAYS_STORED_KEYS = ("location", "volume", "clean")
+
+
+def _is_stored(key: str, value: Any) -> bool:
+    return key in _ALWAYS_STORED_KEYS or value != _DEFAULTS[key]
@@ -0,0 +1,26 @@
+import numpy as np
+
+COLOR_WEIGHT = 0.8
+TOTAL_COLOR_VOLUME_WEIGHT = 0.2
+MAX_COLOR_DISTANCE = np.sqrt(3 * (255**2))
+
+
+def compute_color_loss(
+    rgb: np.ndarray, target_color: list[int], total_color_volume: np.ndarray, max_total_color_volume: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the loss of mixed colors compared to a target color, penalizing the total volume of dispensed color.
+
+    :param rgb: RGB values of shape (3,) or (n, 3).
+    :param target_color: The target RGB color.
+    :param total_color_volume: The total volume of dispensed color, a scalar or of shape (n,).
+    :param max_total_color_volume: The total volume of dispensed color at which the volume penalty saturates.
+    :return: The loss and the color distance to the target color.
+    """
+    color_distance = np.linalg.norm(np.asarray(rgb, dtype=float) - np.asarray(target_color, dtype=float), axis=-1)
+    color_distance_normalized = color_distance / MAX_COLOR_DISTANCE
+
+    normalized_volume = np.minimum(np.asarray(total_color_volume, dtype=float) / max_total_color_volume, 1.0)
+
+    loss = (COLOR_WEIGHT * color_distance_normalized) + (TOTAL_COLOR_VOLUME_WEIGHT * normalized_volume)
+    return loss, color_distance
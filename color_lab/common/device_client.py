@@ -1,41 +1,185 @@
 import json
 import socket
+import threading
+import time
 from typing import Dict, Any
 
 
 class DeviceClient:
-    def __init__(self, port: int, timeout: float = 90.0):
+    def __init__(
+        self,
+        port: int,
+        timeout: float = 90.0,
+        heartbeat_interval: float = 5.0,
+        heartbeat_timeout: float = 5.0,
+        max_reconnect_attempts: int = 5,
+        reconnect_backoff: float = 0.5,
+        max_reconnect_backoff: float = 10.0,
+    ):
         self.port = port
         self.sock = None
+        self.reader = None
         self.timeout = timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.reconnect_backoff = reconnect_backoff
+        self.max_reconnect_backoff = max_reconnect_backoff
+
+        self.last_round_trip_sec: float | None = None
+        self.last_heartbeat_round_trip_sec: float | None = None
+        self.last_heartbeat_time: float | None = None
+        self.command_start_time: float | None = None
+        self.last_heartbeat_ok: bool | None = None
+        self.heartbeat_status: Dict[str, Any] = {}
+
+        self._opened = False
+        self._lock = threading.Lock()
+        self._heartbeat_thread: threading.Thread | None = None
+        self._heartbeat_stop = threading.Event()
 
     def open_connection(self):
         if not self.sock:
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.settimeout(self.timeout)
-            self.sock.connect(("localhost", self.port))
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(("localhost", self.port))
+            except OSError:
+                sock.close()
+                raise
+            self.sock = sock
+            self.reader = sock.makefile()
+            self._opened = True
 
     def close_connection(self):
+        self.stop_heartbeat()
+        with self._lock:
+            self._opened = False
+            self._disconnect()
+
+    def reconnect(self):
+        """Reopen the connection, retrying with exponential backoff."""
+        self._disconnect()
+        backoff = self.reconnect_backoff
+        for attempt in range(1, self.max_reconnect_attempts + 1):
+            try:
+                self.open_connection()
+                return
+            except OSError as e:
+                if attempt == self.max_reconnect_attempts:
+                    raise ConnectionError(
+                        f"Failed to reconnect to port {self.port} after {attempt} attempts: {e}"
+                    ) from e
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_reconnect_backoff)
+
+    def send_command(self, function: str, params: Dict[str, Any]) -> Any:
+        with self._lock:
+            self.command_start_time = time.time()
+            try:
+                result, self.last_round_trip_sec = self._send_command(function, params, self.timeout)
+                return result
+            finally:
+                self.command_start_time = None
+
+    def heartbeat(self) -> bool:
+        """Check that the device driver responds, reconnecting if the connection was lost."""
+        # A command in flight is not interrupted. The heartbeat age keeps growing meanwhile, and the command's running
+        # time is reported, so that a driver that hangs mid-command does not look healthy.
+        if not self._lock.acquire(blocking=False):
+            return self.last_heartbeat_ok is not False
+        try:
+            self.heartbeat_status, self.last_heartbeat_round_trip_sec = self._send_command(
+                "heartbeat", {}, self.heartbeat_timeout
+            )
+            self.last_heartbeat_ok = True
+            self.last_heartbeat_time = time.time()
+            return True
+        except (OSError, RuntimeError, ValueError):
+            self.heartbeat_status = {}
+            self.last_heartbeat_ok = False
+            return False
+        finally:
+            self._lock.release()
+
+    def start_heartbeat(self):
+        """Send heartbeats periodically in a background thread."""
+        if self._heartbeat_thread:
+            return
+        self._heartbeat_stop.clear()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        self._heartbeat_thread.start()
+
+    def stop_heartbeat(self):
+        if self._heartbeat_thread:
+            self._heartbeat_stop.set()
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get the live connection state for device reports."""
+        now = time.time()
+        command_start_time = self.command_start_time
+        return {
+            "connected": self.sock is not None and self.last_heartbeat_ok is not False,
+            "busy": command_start_time is not None,
+            "command_running_sec": now - command_start_time if command_start_time is not None else None,
+            "last_heartbeat_ok": self.last_heartbeat_ok,
+            "last_round_trip_sec": self.last_round_trip_sec,
+            "last_heartbeat_round_trip_sec": self.last_heartbeat_round_trip_sec,
+            "last_heartbeat_age_sec": now - self.last_heartbeat_time if self.last_heartbeat_time is not None else None,
+            **self.heartbeat_status,
+        }
+
+    def _heartbeat_loop(self):
+        while not self._heartbeat_stop.wait(self.heartbeat_interval):
+            self.heartbeat()
+
+    def _disconnect(self):
         if self.sock:
+            self.reader.close()
             self.sock.close()
             self.sock = None
+            self.reader = None
 
-    def send_command(self, function: str, params: Dict[str, Any]) -> Any:
-        if not self.sock:
+    def _write(self, command: str, timeout: float) -> float:
+        self.sock.settimeout(timeout)
+        start_time = time.monotonic()
+        self.sock.sendall(command.encode())
+        return start_time
+
+    def _send_command(self, function: str, params: Dict[str, Any], timeout: float) -> tuple[Any, float]:
+        if not self._opened:
             raise ConnectionError("Connection is not open. Call open_connection() first.")
 
         command = json.dumps({"function": function, "params": params}) + "\n"
-        self.sock.sendall(command.encode())
 
-        response = self.sock.makefile().readline()
+        # The command has not reached the device if the connection is down or sending fails, so it is safe to retry
+        if not self.sock:
+            self.reconnect()
+        try:
+            start_time = self._write(command, timeout)
+        except OSError:
+            self.reconnect()
+            start_time = self._write(command, timeout)
+
+        try:
+            response = self.reader.readline()
+        except OSError:
+            # A late response would be read as the response to the next command, so the connection is dropped
+            self._disconnect()
+            raise
 
         if not response:
+            self._disconnect()
             raise ConnectionError(f"No data received from the server for command: {function}")
 
+        round_trip_sec = time.monotonic() - start_time
+
         try:
             result = json.loads(response.strip())
             if isinstance(result, dict) and "error" in result:
                 raise RuntimeError(f"Server error for command {function}: {result['error']}")
-            return result
+            return result, round_trip_sec
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON received from the server for command {function}: {response}") from e
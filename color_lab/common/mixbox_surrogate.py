@@ -0,0 +1,219 @@
+import argparse
+
+import mixbox
+import numpy as np
+import pandas as pd
+
+from .color_loss import compute_color_loss
+
+COLORS = ("cyan", "magenta", "yellow", "black")
+RECIPE_KEYS = tuple(f"{color}_{quantity}" for color in COLORS for quantity in ("volume", "strength"))
+
+# Coefficients of the Mixbox 2.0 latent-to-RGB polynomial (c) 2022 Secret Weapons, CC BY-NC 4.0, in the monomial order
+# of _monomials. They are the same as in pymixbox and fluid_simulation/js/mixbox.js.
+_POLYNOMIAL_COEFFICIENTS = np.array(
+    [
+        [+0.07717053, +0.02826978, +0.24832992],
+        [+0.95912302, +0.80256528, +0.03561839],
+        [+0.74683774, +0.04868586, +0.00000000],
+        [+0.99518138, +0.99978149, +0.99704802],
+        [+0.04819146, +0.83363781, +0.32515377],
+        [-0.68146950, +1.46107803, +1.06980936],
+        [+0.27058419, -0.15324870, +1.98735057],
+        [+0.80478189, +0.67093710, +0.18424500],
+        [-0.35031003, +1.37855826, +3.68865000],
+        [+1.05128046, +1.97815239, +2.82989073],
+        [+3.21607125, +0.81270228, +1.03384539],
+        [+2.78893374, +0.41565549, -0.04487295],
+        [+3.02162577, +2.55374103, +0.32766114],
+        [+2.95124691, +2.81201112, +1.17578442],
+        [+2.82677043, +0.79933038, +1.81715262],
+        [+2.99691099, +1.22593053, +1.80653661],
+        [+1.87394106, +2.05027182, -0.29835996],
+        [+2.56609566, +7.03428198, +0.62575374],
+        [+4.08329484, -1.40408358, +2.14995522],
+        [+6.00078678, +2.55552042, +1.90739502],
+    ]
+)
+
+
+def _monomials(c: np.ndarray) -> np.ndarray:
+    c0, c1, c2, c3 = c[:, 0], c[:, 1], c[:, 2], c[:, 3]
+    c00, c11, c22, c33 = c0 * c0, c1 * c1, c2 * c2, c3 * c3
+    c01, c02, c12 = c0 * c1, c0 * c2, c1 * c2
+    return np.stack(
+        [
+            c0 * c00,
+            c1 * c11,
+            c2 * c22,
+            c3 * c33,
+            c00 * c1,
+            c01 * c1,
+            c00 * c2,
+            c02 * c2,
+            c00 * c3,
+            c0 * c33,
+            c11 * c2,
+            c1 * c22,
+            c11 * c3,
+            c1 * c33,
+            c22 * c3,
+            c2 * c33,
+            c01 * c2,
+            c01 * c3,
+            c02 * c3,
+            c12 * c3,
+        ],
+        axis=1,
+    )
+
+
+def _pigment_rgb(color: str, strength: float) -> tuple[float, float, float]:
+    """Float RGB of a dispensed color at a strength in percent, as generated by the fluid simulation."""
+    intensity = strength / 100
+    if color == "cyan":
+        return 1 - intensity, 1.0, 1.0
+    if color == "magenta":
+        return 1.0, 1 - intensity, 1.0
+    if color == "yellow":
+        return 1.0, 1.0, 1 - intensity
+    return 1 - intensity, 1 - intensity, 1 - intensity
+
+
+class MixboxSurrogate:
+    """
+    Fast surrogate of the fluid simulation that predicts the RGB color of CMYK recipes with the Mixbox latent mixing
+    model. It follows how the simulation dispenses and measures colors:
+
+    - Each color is splatted as a disk at the canvas center with a radius proportional to its volume, so it covers an
+      area proportional to its volume squared. Colors are dispensed in the order black, yellow, magenta, cyan, and each
+      disk replaces the dye under it, so a color is only visible in the ring outside the disks dispensed after it.
+    - The vortex at the canvas center mixes the visible rings of the dispensed colors in latent space.
+    - The measured color is the average of the canvas pixels in RGB space, where the rest of the canvas is white.
+    """
+
+    def __init__(self, aspect_ratio: float = 16 / 9, max_color_volume: float = 25.0, strength_levels: int = 101):
+        """
+        Initialize the surrogate.
+
+        :param aspect_ratio: The width over the height of the fluid simulation canvas, i.e., of its browser window.
+        :param max_color_volume: The color volume at which the color mixer splats with the full splat radius.
+        :param strength_levels: The number of color strengths in [0, 100] at which latents are tabulated.
+        """
+        self.aspect_ratio = aspect_ratio
+        self.max_color_volume = max_color_volume
+        self.strength_levels = strength_levels
+
+        strengths = np.linspace(0, 100, strength_levels)
+        self._latents = np.array(
+            [[mixbox.float_rgb_to_latent(_pigment_rgb(color, strength)) for strength in strengths] for color in COLORS]
+        )
+
+    def splat_area_fractions(self, volumes: np.ndarray) -> np.ndarray:
+        """
+        Get the fraction of the canvas covered by the splat of each color volume.
+
+        The splat shader fills the disk with length(p) < 10 * radius in canvas height units, where the radius is
+        SPLAT_RADIUS / 100 = volume / max_color_volume / 100, scaled by the aspect ratio on wide canvases.
+        """
+        radius = np.asarray(volumes, dtype=float) / self.max_color_volume / 10 * max(self.aspect_ratio, 1.0)
+        return np.minimum(np.pi * radius**2 / self.aspect_ratio, 1.0)
+
+    def predict_rgb(self, recipes: np.ndarray) -> np.ndarray:
+        """
+        Predict the RGB colors of recipes.
+
+        :param recipes: Array of shape (n, 8) with the volume and strength of each color in the order of RECIPE_KEYS.
+        :return: Array of shape (n, 3) with RGB values in [0, 255].
+        """
+        recipes = np.atleast_2d(np.asarray(recipes, dtype=float))
+        volumes = np.clip(recipes[:, 0::2], 0, None)
+        strengths = np.clip(recipes[:, 1::2], 0, 100)
+
+        # Interpolate the tabulated latents of each color at the recipe strengths
+        position = strengths / 100 * (self.strength_levels - 1)
+        lower = np.minimum(position.astype(int), self.strength_levels - 2)
+        fraction = (position - lower)[..., np.newaxis]
+        color_index = np.arange(len(COLORS))
+        latents = (1 - fraction) * self._latents[color_index, lower] + fraction * self._latents[color_index, lower + 1]
+
+        # Colors without volume or strength are not dispensed
+        areas = self.splat_area_fractions(np.where(strengths > 0, volumes, 0))
+
+        # Colors are dispensed in reverse order, so each color is covered by the largest disk of the colors before it
+        covered_areas = np.zeros_like(areas)
+        covered_areas[:, 1:] = np.maximum.accumulate(areas[:, :-1], axis=1)
+        visible_areas = np.clip(areas - covered_areas, 0, None)
+        dispensed_area = visible_areas.sum(axis=1, keepdims=True)
+
+        weights = visible_areas / np.where(dispensed_area > 0, dispensed_area, 1)
+        latent = (weights[..., np.newaxis] * latents).sum(axis=1)
+        dispensed_rgb = np.clip(_monomials(latent[:, :4]) @ _POLYNOMIAL_COEFFICIENTS + latent[:, 4:], 0, 1)
+
+        rgb = dispensed_area * dispensed_rgb + (1 - dispensed_area)
+        return rgb * 255
+
+    def predict_loss(
+        self, recipes: np.ndarray, target_color: list[int], max_total_color_volume: float = 300.0
+    ) -> np.ndarray:
+        """Predict the "Score Color" task loss of recipes for a target color."""
+        recipes = np.atleast_2d(np.asarray(recipes, dtype=float))
+        loss, _ = compute_color_loss(
+            self.predict_rgb(recipes), target_color, recipes[:, 0::2].sum(axis=1), max_total_color_volume
+        )
+        return loss
+
+    def screen(
+        self, candidates: pd.DataFrame, target_color: list[int], num_keep: int, task_name: str = "mix_colors"
+    ) -> pd.DataFrame:
+        """
+        Keep the candidates with the lowest predicted loss.
+
+        :param candidates: DataFrame of optimizer proposals with columns such as "mix_colors.cyan_volume".
+        :param target_color: The target RGB color.
+        :param num_keep: The number of candidates to keep.
+        :param task_name: The name of the color mixing task in the candidate columns.
+        :return: The kept candidates, ordered from lowest to highest predicted loss.
+        """
+        recipes = candidates[[f"{task_name}.{key}" for key in RECIPE_KEYS]].to_numpy(dtype=float)
+        order = np.argsort(self.predict_loss(recipes, target_color), kind="stable")
+        return candidates.iloc[order[:num_keep]]
+
+    def check(self, measurements: pd.DataFrame, target_color: list[int]) -> dict[str, float]:
+        """
+        Compare predictions with colors measured in the fluid simulation.
+
+        :param measurements: DataFrame with a column per recipe key and the measured "red", "green" and "blue", such as
+            the output of batch_simulation.py with the simulation backend. Rows without measurements are ignored.
+        :param target_color: The target RGB color at which the predicted and measured losses are ranked.
+        :return: The mean absolute error of the predicted RGB values and the Spearman rank correlation between the
+            predicted and measured losses, which determines how well screen() ranks recipes.
+        """
+        measurements = measurements.dropna(subset=["red", "green", "blue"])
+        recipes = measurements[list(RECIPE_KEYS)].to_numpy(dtype=float)
+        measured_rgb = measurements[["red", "green", "blue"]].to_numpy(dtype=float)
+
+        measured_loss, _ = compute_color_loss(measured_rgb, target_color, recipes[:, 0::2].sum(axis=1), 300.0)
+        predicted_loss = self.predict_loss(recipes, target_color)
+        return {
+            "num_measurements": len(measurements),
+            "rgb_mean_absolute_error": float(np.abs(self.predict_rgb(recipes) - measured_rgb).mean()),
+            "loss_rank_correlation": float(pd.Series(predicted_loss).corr(pd.Series(measured_loss), method="spearman")),
+        }
+
+
+def main() -> None:
+    """Check the surrogate against measured fluid simulation colors."""
+    parser = argparse.ArgumentParser(description="Compare Mixbox surrogate predictions with measured colors")
+    parser.add_argument("measurements", type=str, help="CSV output of batch_simulation.py with the simulation backend.")
+    parser.add_argument("--target-color", type=int, nargs=3, required=True, help="Target RGB color.")
+    parser.add_argument("--aspect-ratio", type=float, default=16 / 9, help="Canvas width over height.")
+    args = parser.parse_args()
+
+    surrogate = MixboxSurrogate(aspect_ratio=args.aspect_ratio)
+    for key, value in surrogate.check(pd.read_csv(args.measurements), args.target_color).items():
+        print(f"{key}: {value:.4g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# Bounds of the "Mix Colors" task parameters that campaign optimizers and the batch simulation sample recipes in
+RECIPE_BOUNDS: dict[str, tuple[float, float]] = {
+    "cyan_volume": (0, 25),
+    "cyan_strength": (2, 100),
+    "magenta_volume": (0, 25),
+    "magenta_strength": (2, 100),
+    "yellow_volume": (0, 25),
+    "yellow_strength": (2, 100),
+    "black_volume": (0, 25),
+    "black_strength": (2, 100),
+    "mixing_time": (1, 45),
+    "mixing_speed": (100, 200),
+}
+INTEGER_RECIPE_KEYS = ("mixing_time", "mixing_speed")
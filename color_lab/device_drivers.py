@@ -1,8 +1,16 @@
 import asyncio
+import gzip
+import hashlib
+import itertools
 import json
+import math
+import mimetypes
+import random
 import webbrowser
 import argparse
-from typing import Any, TypedDict, cast
+from pathlib import Path
+from urllib.parse import quote
+from typing import Any, Literal, TypedDict, cast, get_args
 
 import websockets
 from aiohttp import web
@@ -14,18 +22,139 @@ class ColorData(TypedDict):
     b: int
 
 
+LatencyDistribution = Literal["none", "normal", "long_tail"]
+FAULT_RATE_KEYS = ("failure_rate", "disconnect_rate", "websocket_delay_rate")
+
+
+class FaultProfile(TypedDict, total=False):
+    latency_distribution: LatencyDistribution
+    latency_mean_sec: float
+    latency_std_sec: float
+    latency_sigma: float
+    failure_rate: float
+    disconnect_rate: float
+    websocket_delay_rate: float
+    websocket_delay_sec: float
+
+
+def validate_fault_profile(name: str, profile: Any) -> FaultProfile:
+    """Check a fault profile for unknown keys, unknown latency distributions and out-of-range values."""
+    if not isinstance(profile, dict):
+        raise ValueError(f"Fault profile '{name}' must be a JSON object")
+
+    unknown_keys = sorted(set(profile) - set(FaultProfile.__annotations__))
+    if unknown_keys:
+        raise ValueError(f"Fault profile '{name}' has unknown keys: {', '.join(unknown_keys)}")
+
+    distribution = profile.get("latency_distribution", "none")
+    if distribution not in get_args(LatencyDistribution):
+        raise ValueError(
+            f"Fault profile '{name}' has unknown latency distribution '{distribution}', "
+            f"expected one of: {', '.join(get_args(LatencyDistribution))}"
+        )
+
+    for key, value in profile.items():
+        if key == "latency_distribution":
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Fault profile '{name}' has a non-numeric value for '{key}': {value!r}")
+        if key in FAULT_RATE_KEYS and not 0 <= value <= 1:
+            raise ValueError(f"Fault profile '{name}' has '{key}' outside [0, 1]: {value}")
+        if value < 0:
+            raise ValueError(f"Fault profile '{name}' has a negative value for '{key}': {value}")
+
+    return cast(FaultProfile, profile)
+
+
+class FaultInjector:
+    """Injects latency, failures, dropped connections and slow WebSocket replies into simulated devices."""
+
+    def __init__(self, profile: FaultProfile, seed: int | str | None = None):
+        """Initialize the injector with a fault profile and an optional seed for reproducible runs."""
+        self.profile = profile
+        self.rng = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        """Sample an extra command latency in seconds from the configured distribution."""
+        distribution = self.profile.get("latency_distribution", "none")
+        mean = self.profile.get("latency_mean_sec", 0.0)
+
+        if distribution == "normal":
+            return max(0.0, self.rng.gauss(mean, self.profile.get("latency_std_sec", 0.0)))
+        if distribution == "long_tail":
+            if mean <= 0:
+                return 0.0
+            # Log-normal with the configured mean; larger sigma gives a heavier tail
+            sigma = self.profile.get("latency_sigma", 1.0)
+            return self.rng.lognormvariate(math.log(mean) - sigma**2 / 2, sigma)
+        return 0.0
+
+    async def inject_latency(self) -> None:
+        """Delay the current command by a sampled latency."""
+        latency = self.sample_latency()
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def should_fail(self) -> bool:
+        """Decide whether the current command fails."""
+        return self.rng.random() < self.profile.get("failure_rate", 0.0)
+
+    def should_disconnect(self) -> bool:
+        """Decide whether the connection is dropped instead of replying to the current command."""
+        return self.rng.random() < self.profile.get("disconnect_rate", 0.0)
+
+    async def inject_websocket_delay(self) -> None:
+        """Delay a WebSocket reply from the fluid simulation."""
+        if self.rng.random() < self.profile.get("websocket_delay_rate", 0.0):
+            await asyncio.sleep(self.profile.get("websocket_delay_sec", 0.0))
+
+
+class FaultInjectionConfig:
+    """Per-device fault profiles loaded from a JSON config file."""
+
+    def __init__(self, config_path: str, seed: int | None = None):
+        """
+        Load the config file.
+
+        The file has an optional "seed" and a "devices" mapping from device names (e.g., "robot_arm",
+        "color_mixer_1", "fluid_simulation_1") to fault profiles. A "default" profile applies to all devices
+        without their own entry. The seed argument overrides the seed in the file. Unknown keys, unknown latency
+        distributions and rates outside [0, 1] raise a ValueError, so that a typo cannot silently disable a fault.
+        """
+        with open(config_path) as f:
+            config = json.load(f)
+
+        unknown_keys = sorted(set(config) - {"seed", "devices"})
+        if unknown_keys:
+            raise ValueError(f"Fault injection config has unknown keys: {', '.join(unknown_keys)}")
+
+        self.seed = seed if seed is not None else config.get("seed")
+        self.profiles: dict[str, FaultProfile] = {
+            name: validate_fault_profile(name, profile) for name, profile in config.get("devices", {}).items()
+        }
+
+    def get_injector(self, device_name: str) -> FaultInjector | None:
+        """Create the fault injector of a device, with its own random stream derived from the seed."""
+        profile = self.profiles.get(device_name, self.profiles.get("default"))
+        if profile is None:
+            return None
+        seed = f"{self.seed}:{device_name}" if self.seed is not None else None
+        return FaultInjector(profile, seed)
+
+
 class FluidSimulationServer:
     """Handles WebSocket connections for fluid simulation visualization."""
 
-    def __init__(self, host: str = "localhost", port: int = 8030):
+    def __init__(self, host: str = "localhost", port: int = 8030, fault_injector: FaultInjector | None = None):
         """Initialize the server with host and port configuration."""
         self.host = host
         self.port = port
+        self.fault_injector = fault_injector
         self.client = None
         self.client_lock = asyncio.Lock()
         self.message_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
-        self.average_color: ColorData | None = None
-        self.average_color_event = asyncio.Event()
+        self.request_ids = itertools.count()
+        self.pending_replies: dict[int, asyncio.Future[Any]] = {}
         self.websocket_server = None
 
     async def handle_client(self, websocket) -> None:
@@ -48,8 +177,13 @@ class FluidSimulationServer:
             async for message in websocket:
                 data = json.loads(message)
                 if data["type"] == "averageColor":
-                    self.average_color = cast(ColorData, data["color"])
-                    self.average_color_event.set()
+                    if self.fault_injector:
+                        await self.fault_injector.inject_websocket_delay()
+                    self.resolve_reply(data.get("requestId"), cast(ColorData, data["color"]))
+                elif data["type"] == "colorVariance":
+                    if self.fault_injector:
+                        await self.fault_injector.inject_websocket_delay()
+                    self.resolve_reply(data.get("requestId"), cast(ColorData, data["variance"]))
                 else:
                     print(f"Received unknown message type: {data['type']}")
         except websockets.exceptions.ConnectionClosed:
@@ -70,6 +204,14 @@ class FluidSimulationServer:
         except Exception as e:
             print(f"Error sending messages: {e}")
 
+    def resolve_reply(self, request_id: int | None, result: Any) -> None:
+        """Resolve the pending request of a reply. Replies to requests that timed out are dropped."""
+        reply = self.pending_replies.pop(request_id, None)
+        if reply is None or reply.done():
+            print(f"Dropped stale reply to request {request_id}")
+            return
+        reply.set_result(result)
+
     async def start_server(self) -> None:
         """Start the WebSocket server."""
         self.websocket_server = await websockets.serve(self.handle_client, self.host, self.port)
@@ -102,18 +244,32 @@ class FluidSimulationApi:
         message = {"type": "centerSplat"}
         await self.server.send_message(message)
 
+    async def send_request(self, message: dict[str, Any], timeout: float = 10.0) -> Any:
+        """Send a request tagged with a request ID and wait for its reply."""
+        request_id = next(self.server.request_ids)
+        reply = asyncio.get_running_loop().create_future()
+        self.server.pending_replies[request_id] = reply
+        try:
+            await self.server.send_message({**message, "requestId": request_id})
+            return await asyncio.wait_for(reply, timeout=timeout)
+        finally:
+            self.server.pending_replies.pop(request_id, None)
+
     async def compute_average_color(self) -> ColorData | None:
         """Compute the average color of the simulation."""
-        message = {"type": "computeAverageColor"}
-        await self.server.send_message(message)
         try:
-            await asyncio.wait_for(self.server.average_color_event.wait(), timeout=10.0)
-            return self.server.average_color
+            return await self.send_request({"type": "computeAverageColor"})
         except asyncio.TimeoutError:
             print("Timeout waiting for average color response")
             return None
-        finally:
-            self.server.average_color_event.clear()
+
+    async def compute_color_variance(self) -> ColorData | None:
+        """Compute the per-channel color variance of the simulation."""
+        try:
+            return await self.send_request({"type": "computeColorVariance"})
+        except asyncio.TimeoutError:
+            print("Timeout waiting for color variance response")
+            return None
 
 
 class BaseDeviceDriver:
@@ -128,6 +284,10 @@ class BaseDeviceDriver:
         if self.enable_sleeping:
             await asyncio.sleep(duration_sec)
 
+    async def heartbeat(self) -> dict[str, Any]:
+        """Report that the driver is alive."""
+        return {}
+
 
 class CleaningStationDriver(BaseDeviceDriver):
     """Driver for the cleaning station device."""
@@ -145,6 +305,10 @@ class ColorMixerDriver:
         """Initialize the driver with a fluid simulation API."""
         self.fluid_sim_api = fluid_sim_api
 
+    async def heartbeat(self) -> dict[str, Any]:
+        """Report that the driver is alive and whether the fluid simulation is attached."""
+        return {"simulation_connected": self.fluid_sim_api.server.client is not None}
+
     async def mix(
         self,
         cyan_volume: float,
@@ -211,6 +375,10 @@ class ColorAnalyzerDriver(BaseDeviceDriver):
         super().__init__(enable_sleeping)
         self.fluid_sim_api = fluid_sim_api
 
+    async def heartbeat(self) -> dict[str, Any]:
+        """Report that the driver is alive and whether the fluid simulation is attached."""
+        return {"simulation_connected": self.fluid_sim_api.server.client is not None}
+
     async def analyze(self) -> tuple[int, int, int]:
         """Analyze the current color in the simulation."""
         color = await self.fluid_sim_api.compute_average_color()
@@ -234,7 +402,12 @@ class RobotArmDriver(BaseDeviceDriver):
         return True
 
 
-async def handle_device(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, driver: Any) -> None:
+async def handle_device(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    driver: Any,
+    fault_injector: FaultInjector | None = None,
+) -> None:
     """Handle TCP connections to device drivers."""
     addr = writer.get_extra_info("peername")
     print(f"Established connection by {addr}")
@@ -248,6 +421,15 @@ async def handle_device(reader: asyncio.StreamReader, writer: asyncio.StreamWrit
             try:
                 command = json.loads(data.decode())
 
+                # Heartbeats are sent on a wall-clock schedule, so they do not draw from the seeded fault injector
+                if fault_injector and command["function"] != "heartbeat":
+                    await fault_injector.inject_latency()
+                    if fault_injector.should_disconnect():
+                        print(f"Injected dropped connection for command: {command['function']}")
+                        break
+                    if fault_injector.should_fail():
+                        raise RuntimeError(f"Injected failure for command: {command['function']}")
+
                 if hasattr(driver, command["function"]):
                     method = getattr(driver, command["function"])
                     if asyncio.iscoroutinefunction(method):
@@ -278,9 +460,11 @@ async def handle_device(reader: asyncio.StreamReader, writer: asyncio.StreamWrit
         await writer.wait_closed()
 
 
-async def device_listener(driver: Any, port: int, device_name: str) -> None:
+async def device_listener(
+    driver: Any, port: int, device_name: str, fault_injector: FaultInjector | None = None
+) -> None:
     """Start a TCP server for a device driver."""
-    server = await asyncio.start_server(lambda r, w: handle_device(r, w, driver), "localhost", port)
+    server = await asyncio.start_server(lambda r, w: handle_device(r, w, driver, fault_injector), "localhost", port)
     addr = server.sockets[0].getsockname()
     print(f"{device_name.capitalize()} driver listening on {addr}")
 
@@ -288,6 +472,90 @@ async def device_listener(driver: Any, port: int, device_name: str) -> None:
         await server.serve_forever()
 
 
+class StaticAsset:
+    """A static file held in memory together with its precompressed variant and their ETags."""
+
+    def __init__(self, content: bytes, content_type: str):
+        """Initialize the asset and precompress it if compression makes it smaller."""
+        self.content = content
+        self.content_type = content_type
+        content_hash = hashlib.sha256(content).hexdigest()[:32]
+        self.etag = f'"{content_hash}"'
+        self.gzip_etag = f'"{content_hash}-gz"'
+
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        self.gzip_content = compressed if len(compressed) < 0.9 * len(content) else None
+
+
+class StaticAssetServer:
+    """Serves the fluid simulation assets for all simulation instances from a single web server."""
+
+    def __init__(
+        self,
+        asset_dir: Path,
+        host: str = "localhost",
+        port: int = 9050,
+        index_file: str = "Fluid Simulation.html",
+    ):
+        """Initialize the server with the asset directory and host and port configuration."""
+        self.asset_dir = asset_dir
+        self.host = host
+        self.port = port
+        self.index_file = index_file
+        self.assets: dict[str, StaticAsset] = {}
+        self.runner: web.AppRunner | None = None
+
+    def load_assets(self) -> None:
+        """Read and precompress all assets once."""
+        for path in self.asset_dir.rglob("*"):
+            if not path.is_file():
+                continue
+            content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            self.assets[path.relative_to(self.asset_dir).as_posix()] = StaticAsset(path.read_bytes(), content_type)
+
+    async def handle_request(self, request: web.Request) -> web.Response:
+        """Serve an asset, honoring conditional requests and gzip content negotiation."""
+        asset = self.assets.get(request.match_info["path"] or self.index_file)
+        if asset is None:
+            raise web.HTTPNotFound()
+
+        use_gzip = asset.gzip_content is not None and "gzip" in request.headers.get("Accept-Encoding", "")
+        etag = asset.gzip_etag if use_gzip else asset.etag
+
+        # Asset URLs are not versioned, so browsers revalidate every asset and get a 304 unless it changed
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return web.Response(body=asset.gzip_content, content_type=asset.content_type, headers=headers)
+        return web.Response(body=asset.content, content_type=asset.content_type, headers=headers)
+
+    async def start(self) -> None:
+        """Load the assets and start the web server."""
+        self.load_assets()
+
+        app = web.Application()
+        app.router.add_get("/{path:.*}", self.handle_request)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+
+        print(f"Fluid simulation web server started on http://{self.host}:{self.port}")
+
+    def get_instance_url(self, websocket_port: int) -> str:
+        """Get the URL of the simulation page that connects to a simulation instance's WebSocket port."""
+        return f"http://{self.host}:{self.port}/{quote(self.index_file)}?port={websocket_port}"
+
+    async def cleanup(self) -> None:
+        """Stop the web server."""
+        if self.runner:
+            await self.runner.cleanup()
+
+
 class FluidSimulationManager:
     """Manages multiple fluid simulation instances."""
 
@@ -296,44 +564,36 @@ class FluidSimulationManager:
         num_instances: int,
         enable_sleeping: bool = True,
         base_websocket_port: int = 8030,
-        base_web_port: int = 9050,
+        web_port: int = 9050,
+        fault_config: FaultInjectionConfig | None = None,
+        open_browsers: bool = True,
     ):
         """Initialize the manager."""
         self.num_instances = num_instances
+        self.fault_config = fault_config
         self.base_websocket_port = base_websocket_port
-        self.base_web_port = base_web_port
         self.enable_sleeping = enable_sleeping
+        self.open_browsers = open_browsers
         self.fluid_servers: list[FluidSimulationServer] = []
         self.fluid_apis: list[FluidSimulationApi] = []
-        self.web_runners: list[web.AppRunner] = []
+        self.static_server = StaticAssetServer(Path(__file__).parent / "fluid_simulation", port=web_port)
 
     async def initialize_instances(self) -> None:
         """Initialize all simulation instances."""
         for i in range(self.num_instances):
-            websocket_port = self.base_websocket_port + i
-            web_port = self.base_web_port + i
-
-            server = FluidSimulationServer(port=websocket_port)
-            await server.start_server()
+            fault_injector = self.fault_config.get_injector(f"fluid_simulation_{i+1}") if self.fault_config else None
+            server = FluidSimulationServer(port=self.base_websocket_port + i, fault_injector=fault_injector)
             self.fluid_servers.append(server)
             self.fluid_apis.append(FluidSimulationApi(server))
 
-            await self.start_web_server(web_port, websocket_port)
-
-    async def start_web_server(self, web_port: int, websocket_port: int) -> None:
-        """Start a web server for a simulation instance."""
-        app = web.Application()
-        app.router.add_static("/", path="./user/eos_examples/color_lab/fluid_simulation", name="static")
-
-        runner = web.AppRunner(app)
-        await runner.setup()
-        site = web.TCPSite(runner, "localhost", web_port)
-        await site.start()
+        await asyncio.gather(self.static_server.start(), *(server.start_server() for server in self.fluid_servers))
 
-        print(f"Fluid simulation web server started on http://localhost:{web_port}")
-        self.web_runners.append(runner)
-
-        webbrowser.open(new=1, url=f"http://localhost:{web_port}/Fluid Simulation.html?port={websocket_port}")
+        for server in self.fluid_servers:
+            url = self.static_server.get_instance_url(server.port)
+            if self.open_browsers:
+                webbrowser.open(new=1, url=url)
+            else:
+                print(f"Open {url} to start the fluid simulation on port {server.port}")
 
     def get_simulation_devices(self) -> dict[str, tuple[Any, int]]:
         """Get all simulation device drivers with their ports."""
@@ -345,8 +605,7 @@ class FluidSimulationManager:
 
     async def cleanup(self) -> None:
         """Clean up all resources."""
-        for runner in self.web_runners:
-            await runner.cleanup()
+        await self.static_server.cleanup()
 
 
 async def main() -> None:
@@ -354,14 +613,26 @@ async def main() -> None:
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="Fluid Simulation Server")
     parser.add_argument("--enable-sleeping", action="store_true", help="Enable sleeps in the simulation.")
+    parser.add_argument("--no-browser", action="store_true", help="Do not open the fluid simulations in a browser.")
+    parser.add_argument("--fault-config", type=str, help="JSON file with per-device latency and fault profiles.")
+    parser.add_argument("--fault-seed", type=int, help="Seed for fault injection (overrides the seed in the config).")
     args = parser.parse_args()
 
     enable_sleeping = args.enable_sleeping
     print(f"Sleeping is {'enabled' if enable_sleeping else 'disabled'}")
 
+    try:
+        fault_config = FaultInjectionConfig(args.fault_config, args.fault_seed) if args.fault_config else None
+    except ValueError as e:
+        parser.error(f"Invalid fault config {args.fault_config}: {e}")
+    if fault_config:
+        print(f"Fault injection is enabled with seed {fault_config.seed}")
+
     # Initialize fluid simulation manager
     fluid_sim_instances = 3
-    fluid_sim_manager = FluidSimulationManager(fluid_sim_instances, enable_sleeping)
+    fluid_sim_manager = FluidSimulationManager(
+        fluid_sim_instances, enable_sleeping, fault_config=fault_config, open_browsers=not args.no_browser
+    )
     await fluid_sim_manager.initialize_instances()
 
     # Set up all device drivers
@@ -374,7 +645,9 @@ async def main() -> None:
 
     # Start device listeners
     device_tasks = [
-        asyncio.create_task(device_listener(driver, port, device_name))
+        asyncio.create_task(
+            device_listener(driver, port, device_name, fault_config.get_injector(device_name) if fault_config else None)
+        )
         for device_name, (driver, port) in devices.items()
     ]
 
@@ -2,6 +2,7 @@ from typing import Dict, Any
 
 from eos.resources.entities.resource import Resource
 from eos.devices.base_device import BaseDevice
+from user.eos_examples.color_lab.common.beaker_state import BeakerState
 from user.eos_examples.color_lab.common.device_client import DeviceClient
 
 
@@ -10,15 +11,18 @@ class CleaningStation(BaseDevice):
         port = int(init_parameters["port"])
         self.client = DeviceClient(port)
         self.client.open_connection()
+        self.client.start_heartbeat()
 
     async def _cleanup(self) -> None:
         self.client.close_connection()
 
     async def _report(self) -> Dict[str, Any]:
-        return {}
+        return self.client.get_status()
 
     def clean(self, container: Resource, duration_sec: int = 1) -> Resource:
         result = self.client.send_command("clean", {"duration_sec": duration_sec})
         if result:
-            container.meta["clean"] = True
+            state = BeakerState.from_meta(container.meta)
+            state.clean = True
+            state.apply_to(container.meta)
         return container
@@ -10,12 +10,13 @@ class ColorAnalyzer(BaseDevice):
         port = int(init_parameters["port"])
         self.client = DeviceClient(port)
         self.client.open_connection()
+        self.client.start_heartbeat()
 
     async def _cleanup(self) -> None:
         self.client.close_connection()
 
     async def _report(self) -> dict[str, Any]:
-        return {}
+        return self.client.get_status()
 
     def analyze(self, container: Resource) -> tuple[Resource, tuple[int, int, int]]:
         rgb = self.client.send_command("analyze", {})
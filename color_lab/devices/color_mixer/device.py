@@ -2,6 +2,7 @@ from typing import Dict, Any
 
 from eos.resources.entities.resource import Resource
 from eos.devices.base_device import BaseDevice
+from user.eos_examples.color_lab.common.beaker_state import BeakerState
 from user.eos_examples.color_lab.common.device_client import DeviceClient
 
 
@@ -10,12 +11,13 @@ class ColorMixer(BaseDevice):
         port = int(init_parameters["port"])
         self.client = DeviceClient(port)
         self.client.open_connection()
+        self.client.start_heartbeat()
 
     async def _cleanup(self) -> None:
         self.client.close_connection()
 
     async def _report(self) -> Dict[str, Any]:
-        return {}
+        return self.client.get_status()
 
     def mix(
         self,
@@ -43,22 +45,9 @@ class ColorMixer(BaseDevice):
             "mixing_time": mixing_time,
             "mixing_speed": mixing_speed,
         }
-        total_volume = 0
-        for color in ["cyan", "magenta", "yellow", "black"]:
-            volume = params[f"{color}_volume"]
-            strength = params[f"{color}_strength"]
-
-            container.meta[f"{color}_volume"] = container.meta.get(f"{color}_volume", 0) + volume
-            container.meta[f"{color}_strength"] = strength
-            total_volume += volume
-
-        if "volume" not in container.meta:
-            container.meta["volume"] = 0
-        container.meta["volume"] += total_volume
-        container.meta["clean"] = False
-        container.meta["mixing_time"] = mixing_time
-        container.meta["mixing_speed"] = mixing_speed
-        container.meta["clean"] = False
+        state = BeakerState.from_meta(container.meta)
+        state.add_mix(**params)
+        state.apply_to(container.meta)
 
         self.client.send_command("mix", params)
 
@@ -2,6 +2,7 @@ from typing import Dict, Any
 
 from eos.resources.entities.resource import Resource
 from eos.devices.base_device import BaseDevice
+from user.eos_examples.color_lab.common.beaker_state import BeakerState
 from user.eos_examples.color_lab.common.device_client import DeviceClient
 
 
@@ -10,6 +11,7 @@ class RobotArm(BaseDevice):
         port = int(init_parameters["port"])
         self.client = DeviceClient(port)
         self.client.open_connection()
+        self.client.start_heartbeat()
 
         self._arm_location = "center"
 
@@ -17,31 +19,31 @@ class RobotArm(BaseDevice):
         self.client.close_connection()
 
     async def _report(self) -> Dict[str, Any]:
-        return {"arm_location": self._arm_location}
+        return {"arm_location": self._arm_location, **self.client.get_status()}
 
     def move_container(self, container: Resource, target_location: str) -> Resource:
-        if container.meta["location"] != target_location:
-            if self._arm_location != container.meta["location"]:
-                self.client.send_command(
-                    "move", {"from_location": self._arm_location, "to_location": container.meta["location"]}
-                )
-                self._arm_location = container.meta["location"]
-
-            self.client.send_command(
-                "move", {"from_location": container.meta["location"], "to_location": target_location}
-            )
+        state = BeakerState.from_meta(container.meta)
+        if state.location != target_location:
+            if self._arm_location != state.location:
+                self.client.send_command("move", {"from_location": self._arm_location, "to_location": state.location})
+                self._arm_location = state.location
+
+            self.client.send_command("move", {"from_location": state.location, "to_location": target_location})
             self._arm_location = target_location
-            container.meta["location"] = target_location
+            state.location = target_location
 
             if self._arm_location != "center":
                 self.client.send_command("move", {"from_location": self._arm_location, "to_location": "center"})
                 self._arm_location = "center"
 
+        state.apply_to(container.meta)
         return container
 
     def empty_container(self, container: Resource, emptying_location: str) -> Resource:
         container = self.move_container(container, emptying_location)
         result = self.client.send_command("empty", {})
         if result:
-            container.meta["volume"] = 0
+            state = BeakerState.from_meta(container.meta)
+            state.empty()
+            state.apply_to(container.meta)
         return container
@@ -0,0 +1,94 @@
+import pandas as pd
+from bofire.data_models.acquisition_functions.acquisition_function import qUCB
+from bofire.data_models.domain.api import Inputs
+from bofire.data_models.enum import SamplingMethodEnum
+from bofire.data_models.features.continuous import ContinuousOutput, ContinuousInput
+from bofire.data_models.objectives.identity import MinimizeObjective
+
+from eos.optimization.sequential_bayesian_optimizer import BayesianSequentialOptimizer
+from eos.optimization.abstract_sequential_optimizer import AbstractSequentialOptimizer
+from user.eos_examples.color_lab.common.recipe_bounds import RECIPE_BOUNDS
+
+# Must match the number of "Score Color" tasks (score_color_1, score_color_2, ...) in experiment.yml
+NUM_TARGET_COLORS = 3
+
+
+class MultiTargetSequentialOptimizer(AbstractSequentialOptimizer):
+    """
+    Runs one single-objective Bayesian optimizer per target color over shared measurements. Every reported experiment
+    is fed to the optimizers of all targets, and proposals are taken from the targets in turn, so that each target
+    pursues its own minimum rather than a compromise between targets. The first proposals are taken from a single
+    initial design shared by all targets, so that the initial samples stay a balanced space-filling set.
+    """
+
+    def __init__(
+        self,
+        inputs: list[ContinuousInput],
+        outputs: list[ContinuousOutput],
+        num_initial_samples: int,
+        initial_sampling_method: SamplingMethodEnum = SamplingMethodEnum.SOBOL,
+        **kwargs,
+    ):
+        self._outputs = outputs
+        self._optimizers = [
+            BayesianSequentialOptimizer(
+                inputs=inputs,
+                outputs=[output],
+                num_initial_samples=num_initial_samples,
+                initial_sampling_method=initial_sampling_method,
+                **kwargs,
+            )
+            for output in outputs
+        ]
+        self._initial_samples = Inputs(features=inputs).sample(num_initial_samples, method=initial_sampling_method)
+        self._num_initial_samples_taken = 0
+        self._next_target = 0
+
+    def sample(self, num_experiments: int = 1) -> pd.DataFrame:
+        # Experiments reported from an earlier run (e.g., when resuming a campaign) count towards the initial design
+        start = max(self._num_initial_samples_taken, self.get_num_samples_reported())
+        num_initial = max(0, min(num_experiments, len(self._initial_samples) - start))
+        self._num_initial_samples_taken = start + num_initial
+        samples = [self._initial_samples.iloc[start : start + num_initial]]
+
+        num_samples = [0] * len(self._optimizers)
+        for _ in range(num_experiments - num_initial):
+            num_samples[self._next_target] += 1
+            self._next_target = (self._next_target + 1) % len(self._optimizers)
+        samples += [
+            optimizer.sample(num) for optimizer, num in zip(self._optimizers, num_samples, strict=True) if num > 0
+        ]
+
+        return pd.concat(samples, ignore_index=True)[self.get_input_names()]
+
+    def report(self, inputs_df: pd.DataFrame, outputs_df: pd.DataFrame) -> None:
+        for optimizer, output in zip(self._optimizers, self._outputs, strict=True):
+            optimizer.report(inputs_df, outputs_df[[output.key]])
+
+    def get_optimal_solutions(self) -> pd.DataFrame:
+        return pd.concat([optimizer.get_optimal_solutions() for optimizer in self._optimizers], ignore_index=True)
+
+    def get_input_names(self) -> list[str]:
+        return self._optimizers[0].get_input_names()
+
+    def get_output_names(self) -> list[str]:
+        return [output.key for output in self._outputs]
+
+    def get_num_samples_reported(self) -> int:
+        return self._optimizers[0].get_num_samples_reported()
+
+
+def eos_create_campaign_optimizer() -> tuple[dict, type[AbstractSequentialOptimizer]]:
+    constructor_args = {
+        "inputs": [ContinuousInput(key=f"mix_colors.{key}", bounds=bounds) for key, bounds in RECIPE_BOUNDS.items()],
+        "outputs": [
+            ContinuousOutput(key=f"score_color_{i}.loss", objective=MinimizeObjective(w=1.0))
+            for i in range(1, NUM_TARGET_COLORS + 1)
+        ],
+        "constraints": [],
+        "acquisition_function": qUCB(beta=1),
+        "num_initial_samples": 25,
+        "initial_sampling_method": SamplingMethodEnum.SOBOL,
+    }
+
+    return constructor_args, MultiTargetSequentialOptimizer
@@ -1686,10 +1686,10 @@ class FluidSimulationWebSocket {
                 this.performCenterSplat();
                 break;
             case "computeAverageColor":
-                this.performComputeAverageColor();
+                this.performComputeAverageColor(data.requestId);
                 break;
             case "computeColorVariance":
-                this.performComputeColorVariance();
+                this.performComputeColorVariance(data.requestId);
                 break;
             case "computeColorStandardDeviation":
                 this.performComputeColorStandardDeviation();
@@ -1730,23 +1730,25 @@ class FluidSimulationWebSocket {
         splat(centerX / canvas.width, centerY / canvas.height, dx, dy, color);
     }
 
-    performComputeAverageColor() {
+    performComputeAverageColor(requestId) {
         const avgColor = computeAverageColor();
         console.log("Computed average color:", avgColor);
         this.socket.send(
             JSON.stringify({
                 type: "averageColor",
+                requestId: requestId,
                 color: avgColor,
             })
         );
     }
 
-    performComputeColorVariance() {
+    performComputeColorVariance(requestId) {
         const colorVariance = computeColorVariance();
         console.log("Computed color variance:", colorVariance);
         this.socket.send(
             JSON.stringify({
                 type: "colorVariance",
+                requestId: requestId,
                 variance: colorVariance,
             })
         );
@@ -34,6 +34,5 @@ class MixColors(BaseTask):
             mixing_time,
             mixing_speed,
         )
-        resources["beaker"].meta["clean"] = False
 
         return {"total_color_volume": cyan_volume + magenta_volume + yellow_volume + black_volume}, resources, None
@@ -1,4 +1,5 @@
 from eos.tasks.base_task import BaseTask
+from user.eos_examples.color_lab.common.beaker_state import BeakerState
 
 
 class StoreContainer(BaseTask):
@@ -13,7 +14,9 @@ class StoreContainer(BaseTask):
 
         beaker = robot_arm.move_container(resources["beaker"], storage_location)
 
-        beaker.meta = {"volume": 0, "clean": True, "location": storage_location}
+        state = BeakerState.from_meta(beaker.meta)
+        state.reset(storage_location)
+        state.apply_to(beaker.meta)
         resources["beaker"] = beaker
 
         return None, resources, None